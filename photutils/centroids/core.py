@@ -3,14 +3,17 @@
 The module contains tools for centroiding sources.
 """
 
+from concurrent.futures import ProcessPoolExecutor
 import inspect
+import itertools
+import os
 import warnings
 
 from astropy.modeling import Fittable2DModel, Parameter
 from astropy.modeling.fitting import LevMarLSQFitter
-from astropy.modeling.models import (CONSTRAINTS_DOC, Const1D, Const2D,
-                                     Gaussian1D, Gaussian2D)
-from astropy.nddata.utils import overlap_slices
+from astropy.modeling.models import (CONSTRAINTS_DOC, Const1D, Gaussian1D,
+                                     Gaussian2D)
+from astropy.nddata.utils import NoOverlapError
 from astropy.utils.exceptions import AstropyUserWarning
 import numpy as np
 
@@ -65,15 +68,85 @@ class GaussianConst2D(Fittable2DModel):
                  y_stddev, theta):
         """Two dimensional Gaussian plus constant function."""
 
-        model = Const2D(constant)(x, y) + Gaussian2D(amplitude, x_mean,
-                                                     y_mean, x_stddev,
-                                                     y_stddev, theta)(x, y)
-        return model
+        return constant + Gaussian2D.evaluate(x, y, amplitude, x_mean,
+                                              y_mean, x_stddev, y_stddev,
+                                              theta)
+
+    @staticmethod
+    def fit_deriv(x, y, constant, amplitude, x_mean, y_mean, x_stddev,
+                  y_stddev, theta):
+        """
+        Two dimensional Gaussian plus constant function derivative with
+        respect to parameters.
+        """
+
+        deriv = Gaussian2D.fit_deriv(x, y, amplitude, x_mean, y_mean,
+                                     x_stddev, y_stddev, theta)
+        return [np.ones_like(deriv[0])] + deriv
 
 
 GaussianConst2D.__doc__ += CONSTRAINTS_DOC
 
 
+def _has_nonfinite(data):
+    """
+    Check if an array contains any non-finite values (e.g. NaNs or
+    infs).
+
+    The sum of an array is non-finite if the array contains any
+    non-finite values, so clean data are checked with a single
+    reduction, without allocating a boolean array.  A non-finite sum is
+    confirmed with a full check because the sum can also overflow.
+
+    Parameters
+    ----------
+    data : array_like
+        The input array.  Masked values of a `~numpy.ma.MaskedArray`
+        are ignored.
+
+    Returns
+    -------
+    result : bool
+        `True` if ``data`` contains any non-finite values.
+    """
+
+    total = np.asanyarray(data).sum()
+    if total is np.ma.masked or np.isfinite(total):
+        return False
+
+    return not np.all(np.isfinite(data))
+
+
+def _process_oversampling(oversampling):
+    """
+    Return the oversampling factors as a tuple of Python floats in
+    ``(x, y)`` order.
+
+    A scalar (or length-1) ``oversampling`` is used for both axes.
+
+    Parameters
+    ----------
+    oversampling : float or tuple of floats
+        The input oversampling factor(s).
+
+    Returns
+    -------
+    oversampling : tuple of floats
+        The oversampling factors.
+    """
+
+    try:
+        oversampling = tuple(float(value) for value in oversampling)
+    except TypeError:
+        oversampling = (float(oversampling),)
+    if len(oversampling) == 1:
+        oversampling *= 2
+    if min(oversampling) <= 0:
+        raise ValueError('Oversampling factors must all be positive numbers.')
+
+    return oversampling
+
+
 def centroid_com(data, mask=None, oversampling=1.):
     """
     Calculate the centroid of an n-dimensional array as its "center of
@@ -103,33 +176,94 @@ def centroid_com(data, mask=None, oversampling=1.):
         or ``(x, y, z)``), not numpy axis order.
     """
 
-    oversampling = np.atleast_1d(oversampling)
-    if len(oversampling) == 1:
-        oversampling = np.repeat(oversampling, 2)
-    # as these need to match data we reverse the order to (y, x)
-    oversampling = oversampling[::-1]
-    if np.any(oversampling <= 0):
-        raise ValueError('Oversampling factors must all be positive numbers.')
-    data = data.astype(float)
+    oversampling = _process_oversampling(oversampling)
+
+    data = np.asanyarray(data)
 
     if mask is not None and mask is not np.ma.nomask:
         mask = np.asarray(mask, dtype=bool)
         if data.shape != mask.shape:
             raise ValueError('data and mask must have the same shape.')
+    else:
+        mask = None
+
+    # combine the mask of a MaskedArray input with the input mask; the
+    # moments below are computed from the unmasked (raw) data values
+    if np.ma.getmask(data) is not np.ma.nomask:
+        data_mask = np.ma.getmaskarray(data)
+        mask = data_mask if mask is None else mask | data_mask
+    data = np.ma.getdata(data)
+
+    if mask is not None:
+        # copy the data to avoid modifying the input array
+        data = data.astype(float)
         data[mask] = 0.
+        is_copy = True
+    else:
+        # the data are not copied if they already have a float dtype
+        data = np.asarray(data, dtype=float)
+        is_copy = False
 
-    badidx = ~np.isfinite(data)
-    if np.any(badidx):
+    if _has_nonfinite(data):
         warnings.warn('Input data contains input values (e.g. NaNs or infs), '
                       'which were automatically masked.', AstropyUserWarning)
-        data[badidx] = 0.
+        if not is_copy:
+            data = data.copy()
+        data[~np.isfinite(data)] = 0.
+
+    if data.ndim == 2:
+        return _centroid_com_2d(data) / oversampling
+
+    # as these need to match data we reverse the order to (y, x)
+    oversampling = oversampling[::-1]
 
-    total = np.sum(data)
-    indices = np.ogrid[[slice(0, i) for i in data.shape]]
+    # Reduce the data to its 1D marginal distribution along each axis.
+    # The first moment along an axis is then a 1D dot product, avoiding
+    # the full-size ``index * data`` temporary arrays, and the total is
+    # taken from a (small) marginal instead of another pass over data.
+    # The marginals are computed with einsum (e.g. 'ij->i' for axis 0),
+    # which reduces over all other axes in a single call.
+    axes = list(range(data.ndim))
+    centroid = []
+    for axis in axes:
+        marginal = np.einsum(data, axes, [axis])
+        centroid.append(np.dot(np.arange(data.shape[axis]), marginal) /
+                        oversampling[axis])
+    total = np.sum(marginal)
 
     # note the output array is reversed to give (x, y) order
-    return np.array([np.sum(indices[axis] * data) / total / oversampling[axis]
-                     for axis in range(data.ndim)])[::-1]
+    return np.array(centroid)[::-1] / total
+
+
+def _centroid_com_2d(data):
+    """
+    Calculate the (x, y) center of mass of a 2D array.
+
+    The zeroth and first moments are all taken from a single
+    matrix-vector product over the data, ``data @ [1, x]``, which is
+    a single streaming (BLAS) pass over the array. The remaining
+    reduction over the rows is a small ``(2, ny) @ (ny, 2)`` product
+    giving ``[[sum, sum_x], [sum_y, sum_xy]]``.
+
+    Parameters
+    ----------
+    data : 2D `~numpy.ndarray`
+        The input float array, without any non-finite values.
+
+    Returns
+    -------
+    centroid : `~numpy.ndarray`
+        The ``(x, y)`` coordinates of the centroid.
+    """
+
+    ny, nx = data.shape
+    xweights = np.ones((nx, 2))
+    xweights[:, 1] = np.arange(nx)
+    yweights = np.ones((2, ny))
+    yweights[1] = np.arange(ny)
+    moments = np.dot(yweights, np.dot(np.asarray(data), xweights))
+
+    return moments[[0, 1], [1, 0]] / moments[0, 0]
 
 
 def gaussian1d_moments(data, mask=None):
@@ -154,7 +288,7 @@ def gaussian1d_moments(data, mask=None):
         The estimated parameters of a 1D Gaussian.
     """
 
-    if np.any(~np.isfinite(data)):
+    if _has_nonfinite(data):
         data = np.ma.masked_invalid(data)
         warnings.warn('Input data contains input values (e.g. NaNs or infs), '
                       'which were automatically masked.', AstropyUserWarning)
@@ -162,7 +296,7 @@ def gaussian1d_moments(data, mask=None):
         data = np.ma.array(data)
 
     if mask is not None and mask is not np.ma.nomask:
-        mask = np.asanyarray(mask)
+        mask = np.asanyarray(mask, dtype=bool)
         if data.shape != mask.shape:
             raise ValueError('data and mask must have the same shape.')
         data.mask |= mask
@@ -205,56 +339,66 @@ def fit_2dgaussian(data, error=None, mask=None):
         The best-fitting Gaussian 2D model.
     """
 
-    from ..morphology import data_properties  # prevent circular imports
-
-    data = np.ma.asanyarray(data)
+    # good is the combined mask of valid pixels; the input data are
+    # copied so that the invalid pixels can be zeroed below
+    good = ~np.ma.getmaskarray(data)
+    data = np.array(np.ma.getdata(data), dtype=float)
 
     if mask is not None and mask is not np.ma.nomask:
-        mask = np.asanyarray(mask)
+        mask = np.asanyarray(mask, dtype=bool)
         if data.shape != mask.shape:
             raise ValueError('data and mask must have the same shape.')
-        data.mask |= mask
+        good &= ~mask
 
-    if np.any(~np.isfinite(data)):
-        data = np.ma.masked_invalid(data)
+    finite = np.isfinite(data)
+    if not np.all(finite[good]):
         warnings.warn('Input data contains input values (e.g. NaNs or infs), '
                       'which were automatically masked.', AstropyUserWarning)
+    good &= finite
 
     if error is not None:
-        error = np.ma.masked_invalid(error)
-        if data.shape != error.shape:
+        if data.shape != np.shape(error):
             raise ValueError('data and error must have the same shape.')
-        data.mask |= error.mask
+        good &= ~np.ma.getmaskarray(error)
+        error = np.asarray(np.ma.getdata(error), dtype=float)
+        good &= np.isfinite(error)
         weights = 1.0 / error.clip(min=1.e-30)
     else:
-        weights = np.ones(data.shape)
+        weights = None
 
-    if np.ma.count(data) < 7:
+    if np.count_nonzero(good) < 7:
         raise ValueError('Input data must have a least 7 unmasked values to '
                          'fit a 2D Gaussian plus a constant.')
 
-    # assign zero weight to masked pixels
-    if data.mask is not np.ma.nomask:
-        weights[data.mask] = 0.
-
-    mask = data.mask
-    data.fill_value = 0.0
-    data = data.filled()
-
-    # Subtract the minimum of the data as a crude background estimate.
-    # This will also make the data values positive, preventing issues with
-    # the moment estimation in data_properties (moments from negative data
-    # values can yield undefined Gaussian parameters, e.g. x/y_stddev).
-    props = data_properties(data - np.min(data), mask=mask)
-
-    init_const = 0.  # subtracted data minimum above
-    init_amplitude = np.ptp(data)
-    g_init = GaussianConst2D(constant=init_const, amplitude=init_amplitude,
-                             x_mean=props.xcentroid.value,
-                             y_mean=props.ycentroid.value,
-                             x_stddev=props.semimajor_axis_sigma.value,
-                             y_stddev=props.semiminor_axis_sigma.value,
-                             theta=props.orientation.value)
+    # assign zero weight to masked pixels; without errors or masked
+    # pixels the fit is unweighted
+    mask = ~good
+    data[mask] = 0.
+    if weights is not None:
+        weights[mask] = 0.
+    elif not np.all(good):
+        weights = good.astype(float)
+
+    init_params = _gaussian2d_closed_form(data, mask=mask)
+    if init_params is None:
+        from ..morphology import data_properties  # prevent circular imports
+
+        # Subtract the minimum of the data as a crude background
+        # estimate.  This will also make the data values positive,
+        # preventing issues with the moment estimation in
+        # data_properties (moments from negative data values can yield
+        # undefined Gaussian parameters, e.g. x/y_stddev).
+        props = data_properties(data - np.min(data), mask=mask)
+
+        init_const = 0.  # subtracted data minimum above
+        init_amplitude = np.ptp(data)
+        init_params = (init_const, init_amplitude, props.xcentroid.value,
+                       props.ycentroid.value,
+                       props.semimajor_axis_sigma.value,
+                       props.semiminor_axis_sigma.value,
+                       props.orientation.value)
+
+    g_init = GaussianConst2D(*init_params)
     fitter = LevMarLSQFitter()
     y, x = np.indices(data.shape)
     gfit = fitter(g_init, x, y, data, weights=weights)
@@ -262,6 +406,79 @@ def fit_2dgaussian(data, error=None, mask=None):
     return gfit
 
 
+def _gaussian2d_closed_form(data, mask):
+    """
+    Estimate the parameters of a 2D Gaussian plus a constant in closed
+    form.
+
+    The logarithm of a 2D Gaussian is a quadratic function of ``x`` and
+    ``y``.  After subtracting the minimum of the data as a crude
+    background estimate, a quadratic is fit to the logarithm of the
+    data using linear least squares.  Each pixel is weighted by its
+    background-subtracted value to suppress the (noisy) faint pixels
+    (Guo 2011, IEEE Signal Processing Magazine 28, 134).  The result
+    is accurate enough to be used as the starting point of a nonlinear
+    fit.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        The 2D array of the image.
+
+    mask : `~numpy.ndarray` (bool)
+        A boolean mask, with the same shape as ``data``, where a `True`
+        value indicates the corresponding element of ``data`` is masked.
+
+    Returns
+    -------
+    result : tuple of floats or `None`
+        The ``(constant, amplitude, x_mean, y_mean, x_stddev, y_stddev,
+        theta)`` parameters of the Gaussian plus a constant, or `None`
+        if the fitted quadratic does not describe a Gaussian peak within
+        the data.
+    """
+
+    constant = np.min(data[~mask])
+    values = data - constant
+    # exclude the faint pixels, whose log values are dominated by noise
+    good = ~mask & (values > 0.1 * np.max(values[~mask]))
+    if np.count_nonzero(good) < 6:
+        return None
+
+    y, x = np.nonzero(good)
+    values = values[good]
+    design = np.column_stack([np.ones(x.size), x, y, x**2, y**2,
+                              x * y]).astype(float)
+    # an explicit rcond (the rcond=None default of numpy >= 1.14)
+    # supports older numpy versions
+    rcond = np.finfo(float).eps * max(design.shape)
+    coeffs = np.linalg.lstsq(design * values[:, np.newaxis],
+                             np.log(values) * values, rcond=rcond)[0]
+
+    # the quadratic terms are -(a*x**2 + 2*b*x*y + c*y**2), which must
+    # be a positive-definite quadratic form for a Gaussian peak
+    quad = -np.array([[coeffs[3], 0.5 * coeffs[5]],
+                      [0.5 * coeffs[5], coeffs[4]]])
+    if np.any(np.linalg.eigvalsh(quad) <= 0):
+        return None
+
+    x_mean, y_mean = np.linalg.solve(2. * quad, coeffs[1:3])
+    if not (0 <= x_mean < data.shape[1] and 0 <= y_mean < data.shape[0]):
+        return None
+
+    amplitude = np.exp(np.dot([1., x_mean, y_mean, x_mean**2, y_mean**2,
+                               x_mean * y_mean], coeffs))
+    if not np.isfinite(amplitude):
+        return None
+
+    # same convention as the Gaussian2D cov_matrix input
+    eig_vals, eig_vecs = np.linalg.eigh(np.linalg.inv(2. * quad))
+    x_stddev, y_stddev = np.sqrt(eig_vals)
+    theta = np.arctan2(eig_vecs[1, 0], eig_vecs[0, 0])
+
+    return (constant, amplitude, x_mean, y_mean, x_stddev, y_stddev, theta)
+
+
 def centroid_1dg(data, error=None, mask=None):
     """
     Calculate the centroid of a 2D array by fitting 1D Gaussians to the
@@ -293,25 +510,27 @@ def centroid_1dg(data, error=None, mask=None):
     data = np.ma.asanyarray(data)
 
     if mask is not None and mask is not np.ma.nomask:
-        mask = np.asanyarray(mask)
+        mask = np.asanyarray(mask, dtype=bool)
         if data.shape != mask.shape:
             raise ValueError('data and mask must have the same shape.')
         data.mask |= mask
 
-    if np.any(~np.isfinite(data)):
+    if _has_nonfinite(data):
         data = np.ma.masked_invalid(data)
         warnings.warn('Input data contains input values (e.g. NaNs or infs), '
                       'which were automatically masked.', AstropyUserWarning)
 
     if error is not None:
-        error = np.ma.masked_invalid(error)
-        if data.shape != error.shape:
+        if data.shape != np.shape(error):
             raise ValueError('data and error must have the same shape.')
-        data.mask |= error.mask
-
-        error.mask = data.mask
-        xy_error = np.array([np.sqrt(np.ma.sum(error**2, axis=i))
-                             for i in [0, 1]])
+        data.mask |= np.ma.getmaskarray(error)
+        error = np.asarray(np.ma.getdata(error), dtype=float)
+        data.mask |= ~np.isfinite(error)
+
+        # sum the variances of the unmasked pixels along each axis
+        variance = error**2
+        variance[np.ma.getmaskarray(data)] = 0.
+        xy_error = [np.sqrt(np.sum(variance, axis=i)) for i in [0, 1]]
         xy_weights = [(1.0 / xy_error[i].clip(min=1.e-30)) for i in [0, 1]]
     else:
         xy_weights = [np.ones(data.shape[i]) for i in [1, 0]]
@@ -322,19 +541,58 @@ def centroid_1dg(data, error=None, mask=None):
         for i in [0, 1]:
             xy_weights[i][bad_idx[i]] = 0.
 
-    xy_data = np.array([np.ma.sum(data, axis=i) for i in [0, 1]])
+    x_data = np.ma.sum(data, axis=0).filled(0.)
+    y_data = np.ma.sum(data, axis=1).filled(0.)
 
     constant_init = np.ma.min(data)
-    centroid = []
-    for (data_i, weights_i) in zip(xy_data, xy_weights):
-        params_init = gaussian1d_moments(data_i)
-        g_init = Const1D(constant_init) + Gaussian1D(*params_init)
-        fitter = LevMarLSQFitter()
-        x = np.arange(data_i.size)
-        g_fit = fitter(g_init, x, data_i, weights=weights_i)
-        centroid.append(g_fit.mean_1.value)
+    fitter = LevMarLSQFitter()
+    # the compound model is built only once; the fitter fits a copy of
+    # it, so it can be reused for both axes
+    g_init = Const1D() + Gaussian1D()
+    indices = np.arange(max(data.shape))
+    xcen = _fit_1dgaussian(indices[:x_data.size], x_data, xy_weights[0],
+                           constant_init, g_init, fitter)
+    ycen = _fit_1dgaussian(indices[:y_data.size], y_data, xy_weights[1],
+                           constant_init, g_init, fitter)
+
+    return np.array([xcen, ycen])
+
+
+def _fit_1dgaussian(x, data, weights, constant_init, g_init, fitter):
+    """
+    Fit a 1D Gaussian plus a constant to 1D data.
+
+    Parameters
+    ----------
+    x : 1D `~numpy.ndarray`
+        The pixel indices of ``data``.
+
+    data : 1D `~numpy.ndarray`
+        The 1D data array.
+
+    weights : 1D `~numpy.ndarray`
+        The fit weights of ``data``.
 
-    return np.array(centroid)
+    constant_init : float
+        The initial value of the constant.
+
+    g_init : `~astropy.modeling.CompoundModel`
+        A ``Const1D + Gaussian1D`` model whose parameters are set to
+        the initial values in place.
+
+    fitter : `~astropy.modeling.fitting.LevMarLSQFitter`
+        The fitter instance used to perform the fit.
+
+    Returns
+    -------
+    mean : float
+        The mean of the best-fitting 1D Gaussian.
+    """
+
+    g_init.parameters = (constant_init,) + gaussian1d_moments(data)
+    g_fit = fitter(g_init, x, data, weights=weights)
+
+    return g_fit.mean_1.value
 
 
 def centroid_2dg(data, error=None, mask=None):
@@ -371,7 +629,8 @@ def centroid_2dg(data, error=None, mask=None):
 
 
 def centroid_sources(data, xpos, ypos, box_size=11, footprint=None,
-                     error=None, mask=None, centroid_func=centroid_com):
+                     error=None, mask=None, centroid_func=centroid_com,
+                     nproc=1):
     """
     Calculate the centroid of sources at the defined positions.
 
@@ -425,6 +684,19 @@ def centroid_sources(data, xpos, ypos, box_size=11, footprint=None,
         and y centroids.  The default is
         `~photutils.centroids.centroid_com`.
 
+    nproc : int or `None`, optional
+        The (positive) number of processes used to calculate the
+        centroids.  If `None`, then the number of processors on the
+        machine is used.
+        Multiple processes are useful for computationally expensive
+        centroid functions (e.g. `~photutils.centroids.centroid_1dg`
+        or `~photutils.centroids.centroid_2dg`) and many sources.  If
+        ``nproc`` is not 1, then ``centroid_func`` must be picklable
+        (e.g. a function defined at the top level of a module).
+        ``nproc`` is ignored for the default
+        `~photutils.centroids.centroid_com`, which calculates the
+        centroids of all sources at once.
+
     Returns
     -------
     xcentroid, ycentroid : `~numpy.ndarray`
@@ -438,6 +710,11 @@ def centroid_sources(data, xpos, ypos, box_size=11, footprint=None,
     if ypos.ndim != 1:
         raise ValueError('ypos must be a 1D array.')
 
+    if nproc is not None and (isinstance(nproc, bool) or
+                              not isinstance(nproc, (int, np.integer)) or
+                              nproc < 1):
+        raise ValueError('nproc must be a positive integer or None.')
+
     if footprint is None:
         if box_size is None:
             raise ValueError('box_size or footprint must be defined.')
@@ -454,6 +731,9 @@ def centroid_sources(data, xpos, ypos, box_size=11, footprint=None,
         if footprint.ndim != 2:
             raise ValueError('footprint must be a 2D array.')
 
+    if centroid_func is centroid_com:
+        return _centroid_sources_com(data, xpos, ypos, footprint, mask=mask)
+
     use_error = False
     spec = inspect.getfullargspec(centroid_func)
     if 'mask' not in spec.args:
@@ -462,38 +742,261 @@ def centroid_sources(data, xpos, ypos, box_size=11, footprint=None,
     if 'error' in spec.args:
         use_error = True
 
-    xcentroids = []
-    ycentroids = []
-    for xp, yp in zip(xpos, ypos):
-        slices_large, slices_small = overlap_slices(data.shape,
-                                                    footprint.shape, (yp, xp))
-        data_cutout = data[slices_large]
-
-        mask_cutout = None
-        if mask is not None:
-            mask_cutout = mask[slices_large]
+    footprint_mask = ~footprint
+    data_cutouts = []
+    mask_cutouts = []
+    error_cutouts = []
+    # the (x, y) cutout origins in the data
+    origins = np.empty((2, xpos.size), dtype=int)
+    for i, (slices_large, slices_small) in enumerate(
+            _overlap_slices(data.shape, footprint.shape, xpos, ypos)):
+        data_cutouts.append(data[slices_large])
 
-        footprint_mask = ~footprint
         # trim footprint mask if partial overlap on the data
-        footprint_mask = footprint_mask[slices_small]
+        footprint_mask_cutout = footprint_mask[slices_small]
 
-        if mask_cutout is None:
-            mask_cutout = footprint_mask
+        if mask is None:
+            # each source gets its own copy so that a centroid_func
+            # that modifies its mask cannot affect later sources
+            mask_cutouts.append(footprint_mask_cutout.copy())
         else:
             # combine the input mask and footprint mask
-            mask_cutout = np.logical_or(mask_cutout, footprint_mask)
+            mask_cutouts.append(np.logical_or(mask[slices_large],
+                                              footprint_mask_cutout))
 
         if error is not None and use_error:
-            error_cutout = error[slices_large]
-            xcen, ycen = centroid_func(data_cutout, mask=mask_cutout,
-                                       error=error_cutout)
+            error_cutouts.append(error[slices_large])
         else:
-            xcen, ycen = centroid_func(data_cutout, mask=mask_cutout)
+            error_cutouts.append(None)
+
+        origins[0, i] = slices_large[1].start
+        origins[1, i] = slices_large[0].start
+
+    func_args = (itertools.repeat(centroid_func), data_cutouts,
+                 mask_cutouts, error_cutouts)
+    centroids = np.empty((2, xpos.size))
+    if nproc == 1:
+        for i, centroid in enumerate(map(_centroid_cutout, *func_args)):
+            centroids[:, i] = centroid
+    else:
+        # send the cutouts to the workers in chunks (about 4 per
+        # worker) to avoid a pickling round trip for every source
+        nworkers = nproc if nproc is not None else (os.cpu_count() or 1)
+        chunksize = max(1, xpos.size // (4 * nworkers))
+        with ProcessPoolExecutor(max_workers=nproc) as executor:
+            for i, centroid in enumerate(executor.map(_centroid_cutout,
+                                                      *func_args,
+                                                      chunksize=chunksize)):
+                centroids[:, i] = centroid
+    centroids += origins
+
+    return centroids[0], centroids[1]
+
+
+def _overlap_origins(large_array_shape, small_array_shape, xpos, ypos):
+    """
+    Get the indices of the small array (0, 0) pixel in the large array
+    for many positions.
+
+    The small array is centered on each position using the same
+    convention as `~astropy.nddata.utils.overlap_slices`.  The returned
+    indices can be negative or extend beyond the large array for
+    partially overlapping positions.
+
+    Parameters
+    ----------
+    large_array_shape : tuple of 2 int
+        The shape of the large array.
+
+    small_array_shape : tuple of 2 int
+        The shape of the small array.
+
+    xpos, ypos : 1D `~numpy.ndarray`
+        The ``x`` and ``y`` positions of the small array's center with
+        respect to the large array.
+
+    Returns
+    -------
+    indices_min : 2D `~numpy.ndarray` of int
+        A ``(2, npositions)`` array of the large-array ``(y, x)``
+        indices of the small array's (0, 0) pixel.
+    """
+
+    # positions in (y, x) order to match the array shapes
+    positions = np.array([ypos, xpos], dtype=float)
+    if not np.all(np.isfinite(positions)):
+        raise ValueError('Input position contains invalid values (NaNs or '
+                         'infs).')
+
+    small_shape = np.array(small_array_shape)[:, np.newaxis]
+    large_shape = np.array(large_array_shape)[:, np.newaxis]
+
+    # define the min/max pixel indices
+    indices_min = np.ceil(positions - (small_shape / 2.)).astype(int)
+    indices_max = np.ceil(positions + (small_shape / 2.)).astype(int)
+    if np.any(indices_max < 0) or np.any(indices_min >= large_shape):
+        raise NoOverlapError('Arrays do not overlap.')
+
+    return indices_min
+
+
+def _overlap_slices(large_array_shape, small_array_shape, xpos, ypos):
+    """
+    Get the slices for the overlapping part of a small and a large
+    array for many positions.
+
+    This is a vectorized version of
+    `~astropy.nddata.utils.overlap_slices` (in ``'partial'`` mode) for
+    2D arrays, where the pixel edges of all positions are computed at
+    once.
+
+    Parameters
+    ----------
+    large_array_shape : tuple of 2 int
+        The shape of the large array.
+
+    small_array_shape : tuple of 2 int
+        The shape of the small array.
+
+    xpos, ypos : 1D `~numpy.ndarray`
+        The ``x`` and ``y`` positions of the small array's center with
+        respect to the large array.
+
+    Returns
+    -------
+    slices : list of tuple
+        A list containing the ``(slices_large, slices_small)`` tuple for
+        each position, as returned by
+        `~astropy.nddata.utils.overlap_slices`.
+    """
+
+    indices_min = _overlap_origins(large_array_shape, small_array_shape,
+                                   xpos, ypos)
+    small_shape = np.array(small_array_shape)[:, np.newaxis]
+    large_shape = np.array(large_array_shape)[:, np.newaxis]
+    indices_max = indices_min + small_shape
 
-        xcentroids.append(xcen + slices_large[1].start)
-        ycentroids.append(ycen + slices_large[0].start)
+    large_min = np.maximum(indices_min, 0)
+    large_max = np.minimum(indices_max, large_shape)
+    small_min = large_min - indices_min
+    small_max = large_max - indices_min
 
-    return np.array(xcentroids), np.array(ycentroids)
+    edges = zip(*large_min.tolist(), *large_max.tolist(),
+                *small_min.tolist(), *small_max.tolist())
+
+    return [((slice(ly0, ly1), slice(lx0, lx1)),
+             (slice(sy0, sy1), slice(sx0, sx1)))
+            for ly0, lx0, ly1, lx1, sy0, sx0, sy1, sx1 in edges]
+
+
+def _centroid_cutout(centroid_func, data, mask, error):
+    """
+    Calculate the centroid of a single cutout image.
+
+    This is a top-level function so that it can be pickled and sent
+    to the worker processes in `centroid_sources`.
+
+    Parameters
+    ----------
+    centroid_func : callable
+        The function used to calculate the centroid.
+
+    data : 2D `~numpy.ndarray`
+        The cutout image.
+
+    mask : 2D `~numpy.ndarray` (bool)
+        The cutout mask.
+
+    error : 2D `~numpy.ndarray` or `None`
+        The cutout error.  If `None`, then ``error`` is not passed to
+        ``centroid_func``.
+
+    Returns
+    -------
+    xcentroid, ycentroid : float
+        The ``x`` and ``y`` centroid of the cutout image.
+    """
+
+    if error is None:
+        return centroid_func(data, mask=mask)
+    else:
+        return centroid_func(data, mask=mask, error=error)
+
+
+def _centroid_sources_com(data, xpos, ypos, footprint, mask=None):
+    """
+    Calculate the `centroid_com` centroids of many sources at once.
+
+    The cutouts for all sources are collected into a single 3D stack
+    with shape ``(nsources, ny, nx)``, where ``(ny, nx)`` is the shape
+    of ``footprint``, such that the moments of all sources can be
+    computed with a few array reductions instead of calling
+    `centroid_com` for each source.  Regions of a cutout that lie
+    outside of ``data`` are masked.
+
+    Parameters
+    ----------
+    data : array_like
+        The 2D array of the image.
+
+    xpos, ypos : 1D `~numpy.ndarray`
+        The initial ``x`` and ``y`` pixel positions of the sources.
+
+    footprint : 2D `~numpy.ndarray` of bools
+        The local footprint region to cutout for each source.
+
+    mask : array_like (bool), optional
+        A boolean mask, with the same shape as ``data``, where a `True`
+        value indicates the corresponding element of ``data`` is masked.
+
+    Returns
+    -------
+    xcentroid, ycentroid : `~numpy.ndarray`
+        The ``x`` and ``y`` pixel positions of the centroids.
+    """
+
+    # Gather the cutouts of all sources with a single fancy index.
+    # Cutout pixels outside of the data are clipped to the data edges
+    # and then masked, so that sources near the edges do not need to be
+    # handled separately.
+    data = np.asanyarray(data)
+    origins = _overlap_origins(data.shape, footprint.shape, xpos, ypos)
+    rows = origins[0][:, np.newaxis, np.newaxis] + np.arange(
+        footprint.shape[0])[:, np.newaxis]
+    cols = origins[1][:, np.newaxis, np.newaxis] + np.arange(
+        footprint.shape[1])
+    mask_stack = ((rows < 0) | (rows >= data.shape[0]) |
+                  (cols < 0) | (cols >= data.shape[1]))
+    rows = rows.clip(0, data.shape[0] - 1)
+    cols = cols.clip(0, data.shape[1] - 1)
+
+    data_stack = np.asarray(np.ma.getdata(data)[rows, cols], dtype=float)
+    if mask is not None:
+        mask_stack |= np.asanyarray(mask, dtype=bool)[rows, cols]
+    if np.ma.getmask(data) is not np.ma.nomask:
+        mask_stack |= np.ma.getmaskarray(data)[rows, cols]
+
+    mask_stack |= ~footprint
+    data_stack[mask_stack] = 0.
+
+    if _has_nonfinite(data_stack):
+        warnings.warn('Input data contains input values (e.g. NaNs or infs), '
+                      'which were automatically masked.', AstropyUserWarning)
+        data_stack[~np.isfinite(data_stack)] = 0.
+
+    # the total and the first x and y moments of each source, computed
+    # into a single preallocated buffer
+    moments = np.empty((3, len(data_stack)))
+    np.sum(data_stack, axis=(1, 2), out=moments[0])
+    np.einsum('nij,j->n', data_stack, np.arange(footprint.shape[1]),
+              out=moments[1])
+    np.einsum('nij,i->n', data_stack, np.arange(footprint.shape[0]),
+              out=moments[2])
+    moments[1:] /= moments[0]
+    # origins are in (y, x) order
+    moments[1:] += origins[::-1]
+
+    return moments[1], moments[2]
 
 
 def centroid_epsf(data, mask=None, oversampling=4, shift_val=0.5):
@@ -530,11 +1033,7 @@ def centroid_epsf(data, mask=None, oversampling=4, shift_val=0.5):
         The (x, y) coordinates of the centroid in pixel order.
     """
 
-    oversampling = np.atleast_1d(oversampling)
-    if len(oversampling) == 1:
-        oversampling = np.repeat(oversampling, 2)
-    if np.any(oversampling <= 0):
-        raise ValueError('Oversampling factors must all be positive numbers.')
+    oversampling = _process_oversampling(oversampling)
 
     data = data.astype(float)
 
@@ -549,28 +1048,32 @@ def centroid_epsf(data, mask=None, oversampling=4, shift_val=0.5):
 
     # Assume the center of the ePSF is the middle of an odd-sized grid.
     xidx_0 = int((data.shape[1] - 1) / 2)
-    x_0 = np.arange(data.shape[1], dtype=float)[xidx_0] / oversampling[0]
+    x_0 = xidx_0 / oversampling[0]
     yidx_0 = int((data.shape[0] - 1) / 2)
-    y_0 = np.arange(data.shape[0], dtype=float)[yidx_0] / oversampling[1]
-
-    x_shiftidx = np.around((shift_val * oversampling[0])).astype(int)
-    y_shiftidx = np.around((shift_val * oversampling[0])).astype(int)
-
-    badidx = ~np.isfinite([data[y, x]
-                           for x in [xidx_0, xidx_0+x_shiftidx,
-                                     xidx_0+x_shiftidx-1, xidx_0+x_shiftidx+1]
-                           for y in [yidx_0, yidx_0+y_shiftidx,
-                                     yidx_0+y_shiftidx-1,
-                                     yidx_0+y_shiftidx+1]])
-    if np.any(badidx):
+    y_0 = yidx_0 / oversampling[1]
+
+    x_shiftidx = int(round(shift_val * oversampling[0]))
+    y_shiftidx = int(round(shift_val * oversampling[1]))
+
+    # check all combinations of these x and y pixel indices with a
+    # single fancy-indexing lookup
+    xidx = xidx_0 + np.array([0, x_shiftidx, x_shiftidx - 1, x_shiftidx + 1])
+    yidx = yidx_0 + np.array([0, y_shiftidx, y_shiftidx - 1, y_shiftidx + 1])
+    if not np.all(np.isfinite(data[np.ix_(yidx, xidx)])):
         raise ValueError('One or more centroiding pixels is set to a bad '
                          'value, e.g., NaN or inf.')
 
+    # the shifted pixel indices
+    xidx_pos = xidx_0 + x_shiftidx
+    xidx_neg = xidx_0 - x_shiftidx
+    yidx_pos = yidx_0 + y_shiftidx
+    yidx_neg = yidx_0 - y_shiftidx
+
     # In Anderson & King (2000) notation this is psi_E(0.5, 0.0) and
     # values used to compute derivatives.
-    psi_pos_x = data[yidx_0, xidx_0 + x_shiftidx]
-    psi_pos_x_m1 = data[yidx_0, xidx_0 + x_shiftidx - 1]
-    psi_pos_x_p1 = data[yidx_0, xidx_0 + x_shiftidx + 1]
+    psi_pos_x = data[yidx_0, xidx_pos]
+    psi_pos_x_m1 = data[yidx_0, xidx_pos - 1]
+    psi_pos_x_p1 = data[yidx_0, xidx_pos + 1]
 
     # Our derivatives are simple differences across two data points, but
     # this must be in units of the undersampled grid, so 2 pixels becomes
@@ -578,23 +1081,23 @@ def centroid_epsf(data, mask=None, oversampling=4, shift_val=0.5):
     dpsi_pos_x = np.abs(psi_pos_x_p1 - psi_pos_x_m1) / (2. / oversampling[0])
 
     # psi_E(-0.5, 0.0) and derivative components.
-    psi_neg_x = data[yidx_0, xidx_0 - x_shiftidx]
-    psi_neg_x_m1 = data[yidx_0, xidx_0 - x_shiftidx - 1]
-    psi_neg_x_p1 = data[yidx_0, xidx_0 - x_shiftidx + 1]
+    psi_neg_x = data[yidx_0, xidx_neg]
+    psi_neg_x_m1 = data[yidx_0, xidx_neg - 1]
+    psi_neg_x_p1 = data[yidx_0, xidx_neg + 1]
     dpsi_neg_x = np.abs(psi_neg_x_p1 - psi_neg_x_m1) / (2. / oversampling[0])
 
     x_shift = (psi_pos_x - psi_neg_x) / (dpsi_pos_x + dpsi_neg_x)
 
     # psi_E(0.0, 0.5) and derivatives.
-    psi_pos_y = data[yidx_0 + y_shiftidx, xidx_0]
-    psi_pos_y_m1 = data[yidx_0 + y_shiftidx - 1, xidx_0]
-    psi_pos_y_p1 = data[yidx_0 + y_shiftidx + 1, xidx_0]
+    psi_pos_y = data[yidx_pos, xidx_0]
+    psi_pos_y_m1 = data[yidx_pos - 1, xidx_0]
+    psi_pos_y_p1 = data[yidx_pos + 1, xidx_0]
     dpsi_pos_y = np.abs(psi_pos_y_p1 - psi_pos_y_m1) / (2. / oversampling[1])
 
     # psi_E(0.0, -0.5) and derivative components.
-    psi_neg_y = data[yidx_0 - y_shiftidx, xidx_0]
-    psi_neg_y_m1 = data[yidx_0 - y_shiftidx - 1, xidx_0]
-    psi_neg_y_p1 = data[yidx_0 - y_shiftidx + 1, xidx_0]
+    psi_neg_y = data[yidx_neg, xidx_0]
+    psi_neg_y_m1 = data[yidx_neg - 1, xidx_0]
+    psi_neg_y_p1 = data[yidx_neg + 1, xidx_0]
     dpsi_neg_y = np.abs(psi_neg_y_p1 - psi_neg_y_m1) / (2. / oversampling[1])
 
     y_shift = (psi_pos_y - psi_neg_y) / (dpsi_pos_y + dpsi_neg_y)
@@ -3,15 +3,19 @@
 Tests for the core module.
 """
 
+import functools
 import itertools
 
-from astropy.modeling.models import Gaussian1D, Gaussian2D
+from astropy.modeling.models import Gaussian2D
+from astropy.nddata.utils import NoOverlapError, overlap_slices
 import numpy as np
 from numpy.testing import assert_allclose
 import pytest
 
-from ..core import (centroid_1dg, centroid_2dg, centroid_com, centroid_epsf,
-                    fit_2dgaussian, gaussian1d_moments)
+from ..core import (GaussianConst2D, _gaussian2d_closed_form,
+                    _overlap_slices, centroid_1dg, centroid_2dg, centroid_com,
+                    centroid_epsf, centroid_sources, fit_2dgaussian,
+                    gaussian1d_moments)
 from ...psf import IntegratedGaussianPRF
 
 try:
@@ -22,26 +26,89 @@ except ImportError:
     HAS_SCIPY = False
 
 
-XCS = [25.7]
-YCS = [26.2]
+XC = 25.7
+YC = 26.2
 XSTDDEVS = [3.2, 4.0]
 YSTDDEVS = [5.7, 4.1]
-THETAS = np.array([30., 45.]) * np.pi / 180.
-DATA = np.zeros((3, 3))
-DATA[0:2, 1] = 1.
-DATA[1, 0:2] = 1.
-DATA[1, 1] = 2.
+THETAS = np.deg2rad([30., 45.])
+GAUSSIAN_PARAMS = tuple(itertools.product(XSTDDEVS, YSTDDEVS, THETAS))
+DATA = np.array([[0., 1., 0.],
+                 [1., 2., 0.],
+                 [0., 0., 0.]])
+DATA.flags.writeable = False
+
+# the (scalar or tuple) input oversampling and its (x, y) factors
+OVERSAMPLINGS = [(4, (4, 4)), ((4, 6), (4, 6))]
+
+# read-only open coordinate grids shared by the tests
+Y50, X50 = np.ogrid[0:50, 0:50]
+Y50_47, X50_47 = np.ogrid[0:50, 0:47]
+for _grid in (Y50, X50, Y50_47, X50_47):
+    _grid.flags.writeable = False
+
+
+def _gauss2d(x, y, amplitude, x_mean, y_mean, x_stddev, y_stddev,
+             theta=0., dtype=float):
+    """
+    Evaluate a 2D Gaussian directly with NumPy.
+
+    This is the same function as `~astropy.modeling.models.Gaussian2D`,
+    without the overhead of calling an astropy model.  ``x`` and ``y``
+    may be open (broadcastable) grids, e.g., from `numpy.ogrid`, in
+    which case only the cross term is evaluated on the full grid.  The
+    result is computed in float64 and returned with the given
+    ``dtype``.
+    """
+
+    cost2 = np.cos(theta) ** 2
+    sint2 = np.sin(theta) ** 2
+    sin2t = np.sin(2. * theta)
+    xstd2 = x_stddev ** 2
+    ystd2 = y_stddev ** 2
+    a = 0.5 * ((cost2 / xstd2) + (sint2 / ystd2))
+    b = 0.5 * ((sin2t / xstd2) - (sin2t / ystd2))
+    c = 0.5 * ((sint2 / xstd2) + (cost2 / ystd2))
+    dx = x - x_mean
+    dy = y - y_mean
+
+    data = amplitude * np.exp(-((a * dx ** 2) + (b * dx * dy) +
+                                (c * dy ** 2)))
+    return data.astype(dtype, copy=False)
+
+
+# cache of the rendered Gaussian2D images shared by the parametrized
+# tests (see _gaussian_data)
+_DATA_CACHE = {}
+
+
+def _gaussian_data(xc, yc, x_stddev, y_stddev, theta, shape=(50, 50),
+                   dtype=float):
+    """
+    Return a read-only image of a Gaussian2D model.
+
+    The images are cached so that the tests parametrized over the same
+    model parameters reuse a single rendered image.  The returned array
+    must be copied before it is modified.
+    """
+
+    key = (xc, yc, x_stddev, y_stddev, theta, shape, np.dtype(dtype))
+    if key not in _DATA_CACHE:
+        y, x = np.ogrid[0:shape[0], 0:shape[1]]
+        data = _gauss2d(x, y, 2.4, xc, yc, x_stddev, y_stddev, theta,
+                        dtype=dtype)
+        data.flags.writeable = False
+        _DATA_CACHE[key] = data
+
+    return _DATA_CACHE[key]
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
-@pytest.mark.parametrize(
-    ('xc_ref', 'yc_ref', 'x_stddev', 'y_stddev', 'theta'),
-    list(itertools.product(XCS, YCS, XSTDDEVS, YSTDDEVS, THETAS)))
-def test_centroids(xc_ref, yc_ref, x_stddev, y_stddev, theta):
-    model = Gaussian2D(2.4, xc_ref, yc_ref, x_stddev=x_stddev,
-                       y_stddev=y_stddev, theta=theta)
-    y, x = np.mgrid[0:50, 0:47]
-    data = model(x, y)
+@pytest.mark.parametrize(('x_stddev', 'y_stddev', 'theta'),
+                         GAUSSIAN_PARAMS)
+def test_centroids(x_stddev, y_stddev, theta):
+    xc_ref, yc_ref = XC, YC
+    data = _gaussian_data(xc_ref, yc_ref, x_stddev, y_stddev, theta,
+                          shape=(50, 47))
 
     xc, yc = centroid_com(data)
     assert_allclose([xc_ref, yc_ref], [xc, yc], rtol=0, atol=1.e-3)
@@ -54,14 +121,11 @@ def test_centroids(xc_ref, yc_ref, x_stddev, y_stddev, theta):
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
-@pytest.mark.parametrize(
-    ('xc_ref', 'yc_ref', 'x_stddev', 'y_stddev', 'theta'),
-    list(itertools.product(XCS, YCS, XSTDDEVS, YSTDDEVS, THETAS)))
-def test_centroids_witherror(xc_ref, yc_ref, x_stddev, y_stddev, theta):
-    model = Gaussian2D(2.4, xc_ref, yc_ref, x_stddev=x_stddev,
-                       y_stddev=y_stddev, theta=theta)
-    y, x = np.mgrid[0:50, 0:50]
-    data = model(x, y)
+@pytest.mark.parametrize(('x_stddev', 'y_stddev', 'theta'),
+                         GAUSSIAN_PARAMS)
+def test_centroids_witherror(x_stddev, y_stddev, theta):
+    xc_ref, yc_ref = XC, YC
+    data = _gaussian_data(xc_ref, yc_ref, x_stddev, y_stddev, theta)
     error = np.sqrt(data)
 
     xc2, yc2 = centroid_1dg(data, error=error)
@@ -72,33 +136,89 @@ def test_centroids_witherror(xc_ref, yc_ref, x_stddev, y_stddev, theta):
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
-@pytest.mark.parametrize(
-    ('xc_ref', 'yc_ref', 'x_stddev', 'y_stddev', 'theta'),
-    list(itertools.product(XCS, YCS, XSTDDEVS, YSTDDEVS, THETAS)))
-def test_centroids_oversampling(xc_ref, yc_ref, x_stddev, y_stddev, theta):
-    model = Gaussian2D(2.4, xc_ref, yc_ref, x_stddev=x_stddev,
-                       y_stddev=y_stddev, theta=theta)
-    y, x = np.mgrid[0:50, 0:50]
-    data = model(x, y)
+def test_centroids_float32():
+    """
+    Test the centroid functions with single-precision data and error
+    inputs.
+    """
+
+    # the float32 rounding (~1e-7 relative) moves the centroids by much
+    # less than 1e-6 pixel, so the float64 tolerance is kept and the
+    # results must also match the float64 centroids to 1e-6 pixel
+    xc_ref, yc_ref = XC, YC
+    data = _gaussian_data(xc_ref, yc_ref, XSTDDEVS[0], YSTDDEVS[0],
+                          THETAS[0], dtype=np.float32)
+    error = np.sqrt(data)
+    assert data.dtype == error.dtype == np.float32
+    data64 = data.astype(float)
+    error64 = error.astype(float)
+
+    xc, yc = centroid_com(data)
+    assert_allclose([xc_ref, yc_ref], [xc, yc], rtol=0, atol=1.e-3)
+    assert_allclose(centroid_com(data64), [xc, yc], rtol=0, atol=1.e-6)
+
+    for centroid_func in (centroid_1dg, centroid_2dg):
+        xc, yc = centroid_func(data, error=error)
+        assert_allclose([xc_ref, yc_ref], [xc, yc], rtol=0, atol=1.e-3)
+        assert_allclose(centroid_func(data64, error=error64), [xc, yc],
+                        rtol=0, atol=1.e-6)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+def test_centroid_1dg_witherror_nonsquare():
+    xc_ref, yc_ref = 25.7, 26.2
+    y, x = Y50_47, X50_47
+    data = _gauss2d(x, y, 2.4, xc_ref, yc_ref, 3.2, 5.7)
+    error = np.sqrt(data)
+    error[10, 10] = np.nan
+
+    xc, yc = centroid_1dg(data, error=error)
+    assert_allclose([xc_ref, yc_ref], [xc, yc], rtol=0, atol=1.e-3)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+def test_centroid_1dg_masked_error():
+    """
+    Test that the mask of a MaskedArray error is used by centroid_1dg.
+    """
+
+    xc_ref, yc_ref = 24.7, 25.2
+    data = _gaussian_data(xc_ref, yc_ref, 5.0, 5.0, 0.)
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[:, :12] = True
+    error = np.full(data.shape, 0.05)
+    # tiny (masked) errors would dominate the fit if they were used
+    error[mask] = 1.e-6
+    data = data.copy()
+    data[mask] = 1.
+
+    xc, yc = centroid_1dg(data, error=np.ma.MaskedArray(error, mask=mask))
+    assert_allclose([xc, yc], [xc_ref, yc_ref], rtol=0, atol=1.e-3)
+    xc2, yc2 = centroid_1dg(data, error=error, mask=mask)
+    assert_allclose([xc, yc], [xc2, yc2], rtol=0, atol=1.e-10)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+@pytest.mark.parametrize(('x_stddev', 'y_stddev', 'theta'),
+                         GAUSSIAN_PARAMS)
+@pytest.mark.parametrize(('oversampling', 'xy_oversampling'), OVERSAMPLINGS)
+def test_centroids_oversampling(x_stddev, y_stddev, theta, oversampling,
+                                xy_oversampling):
+    xc_ref, yc_ref = XC, YC
+    data = _gaussian_data(xc_ref, yc_ref, x_stddev, y_stddev, theta).copy()
     mask = np.zeros(data.shape, dtype=bool)
     data[10, 10] = 1.e5
     mask[10, 10] = True
-    for oversampling in [4, (4, 6)]:
-        if not hasattr(oversampling, '__len__'):
-            _oversampling = (oversampling, oversampling)
-        else:
-            _oversampling = oversampling
-        xc, yc = centroid_com(data, mask=mask, oversampling=oversampling)
-        assert_allclose([xc, yc], [xc_ref / _oversampling[0], yc_ref / _oversampling[1]],
-                        rtol=0, atol=1.e-3)
+    xc, yc = centroid_com(data, mask=mask, oversampling=oversampling)
+    assert_allclose([xc, yc], [xc_ref / xy_oversampling[0],
+                               yc_ref / xy_oversampling[1]],
+                    rtol=0, atol=1.e-3)
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
 def test_centroids_withmask():
     xc_ref, yc_ref = 24.7, 25.2
-    model = Gaussian2D(2.4, xc_ref, yc_ref, x_stddev=5.0, y_stddev=5.0)
-    y, x = np.mgrid[0:50, 0:50]
-    data = model(x, y)
+    data = _gaussian_data(xc_ref, yc_ref, 5.0, 5.0, 0.).copy()
     mask = np.zeros(data.shape, dtype=bool)
     data[10, 10] = 1.e5
     mask[10, 10] = True
@@ -114,24 +234,45 @@ def test_centroids_withmask():
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
-def test_centroids_withmask_nonbool():
-    data = np.arange(16).reshape(4, 4)
+@pytest.mark.parametrize('centroid_func', (centroid_1dg, centroid_2dg))
+def test_centroids_withmask_nonbool(centroid_func):
+    xc_ref, yc_ref = 24.7, 25.2
+    data = _gaussian_data(xc_ref, yc_ref, 5.0, 5.0, 0.).copy()
     mask = np.zeros(data.shape)
-    mask[0:2, :] = 1
-    mask2 = np.array(mask, dtype=bool)
+    data[10, 10] = 1.e5
+    mask[10, 10] = 1
 
-    xc1, yc1 = centroid_com(data, mask=mask)
-    xc2, yc2 = centroid_com(data, mask=mask2)
+    xc1, yc1 = centroid_func(data, mask=mask)
+    xc2, yc2 = centroid_func(data, mask=mask.astype(bool))
     assert_allclose([xc1, yc1], [xc2, yc2])
+    assert_allclose([xc1, yc1], [xc_ref, yc_ref], rtol=0, atol=1.e-3)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+@pytest.mark.parametrize('centroid_func',
+                         [centroid_com, centroid_1dg, centroid_2dg])
+def test_centroids_bbox_crop(centroid_func):
+    """
+    Test that the centroid of an image whose mask only leaves a
+    rectangular region unmasked is the same as the centroid of that
+    region cropped from the image.
+    """
+
+    data = _gaussian_data(24.7, 25.2, 5.0, 5.0, 0.).copy()
+    mask = np.ones(data.shape, dtype=bool)
+    mask[10:40, 12:38] = False
+    data[mask] = 1.e5
+
+    xc, yc = centroid_func(data, mask=mask)
+    xc2, yc2 = centroid_func(data[10:40, 12:38])
+    assert_allclose([xc, yc], [xc2 + 12, yc2 + 10], rtol=0, atol=1.e-10)
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
 @pytest.mark.parametrize('use_mask', [True, False])
 def test_centroids_nan_withmask(use_mask):
     xc_ref, yc_ref = 24.7, 25.2
-    model = Gaussian2D(2.4, xc_ref, yc_ref, x_stddev=5.0, y_stddev=5.0)
-    y, x = np.mgrid[0:50, 0:50]
-    data = model(x, y)
+    data = _gaussian_data(xc_ref, yc_ref, 5.0, 5.0, 0.).copy()
     data[20, :] = np.nan
     if use_mask:
         mask = np.zeros(data.shape, dtype=bool)
@@ -150,126 +291,267 @@ def test_centroids_nan_withmask(use_mask):
     assert_allclose([xc3, yc3], [xc_ref, yc_ref], rtol=0, atol=1.e-3)
 
 
-def test_centroid_com_mask():
-    """Test centroid_com with and without an image_mask."""
-
-    data = np.ones((2, 2)).astype(float)
-    mask = [[False, False], [True, True]]
-    centroid = centroid_com(data, mask=None)
-    centroid_mask = centroid_com(data, mask=mask)
-    assert_allclose([0.5, 0.5], centroid, rtol=0, atol=1.e-6)
-    assert_allclose([0.5, 0.0], centroid_mask, rtol=0, atol=1.e-6)
-
-
-@pytest.mark.skipif('not HAS_SCIPY')
-def test_invalid_mask_shape():
+def test_centroid_com_ndim():
     """
-    Test if ValueError raises if mask shape doesn't match data
-    shape.
+    Test that the 2D centroid_com path agrees with the n-dimensional
+    one.
     """
 
-    data = np.zeros((4, 4))
-    mask = np.zeros((2, 2), dtype=bool)
+    data = np.zeros((4, 5, 6))
+    data[1, 2, 3] = 1.
+    data[2, 3, 4] = 3.
+    assert_allclose(centroid_com(data, oversampling=(1, 1, 1)),
+                    [3.75, 2.75, 1.75])
+    assert_allclose(centroid_com(data[2]), [4., 3.])
+    assert_allclose(centroid_com(data.sum(axis=0)), [3.75, 2.75])
 
-    with pytest.raises(ValueError):
-        centroid_com(data, mask=mask)
+    # the mask of a MaskedArray input is applied in both paths
+    data[0, 0, 0] = 100.
+    mdata = np.ma.MaskedArray(data, mask=(data == 100.))
+    assert_allclose(centroid_com(mdata, oversampling=(1, 1, 1)),
+                    [3.75, 2.75, 1.75])
+    assert_allclose(centroid_com(mdata[0] + mdata[2]), [4., 3.])
 
-    with pytest.raises(ValueError):
-        centroid_1dg(data, mask=mask)
 
-    with pytest.raises(ValueError):
-        centroid_2dg(data, mask=mask)
+@pytest.mark.parametrize('use_mask', [True, False])
+def test_centroid_com_data_unchanged(use_mask):
+    """Test that centroid_com does not modify the input data."""
 
-    with pytest.raises(ValueError):
-        gaussian1d_moments(data, mask=mask)
+    data = np.ones((4, 4))
+    data[1, 2] = np.nan
+    data_orig = data.copy()
+    mask = None
+    if use_mask:
+        mask = np.zeros(data.shape, dtype=bool)
+        mask[0, 0] = True
+    centroid_com(data, mask=mask)
+    assert_allclose(data, data_orig)
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
-def test_invalid_error_shape():
+@pytest.mark.parametrize(('func', 'data', 'kwargs'), [
+    (centroid_com, np.zeros((4, 4)), {'mask': np.zeros((2, 2), dtype=bool)}),
+    (centroid_1dg, np.zeros((4, 4)), {'mask': np.zeros((2, 2), dtype=bool)}),
+    (centroid_2dg, np.zeros((4, 4)), {'mask': np.zeros((2, 2), dtype=bool)}),
+    (gaussian1d_moments, np.zeros((4, 4)),
+     {'mask': np.zeros((2, 2), dtype=bool)}),
+    (centroid_1dg, np.zeros((4, 4)), {'error': np.zeros((2, 2))}),
+    (centroid_2dg, np.zeros((4, 4)), {'error': np.zeros((2, 2))}),
+    (fit_2dgaussian, np.ones((2, 2)), {})])
+def test_invalid_inputs(func, data, kwargs):
     """
-    Test if ValueError raises if error shape doesn't match data
-    shape.
+    Test if ValueError raises if the mask or error shape doesn't match
+    the data shape, or if there are too few data values to fit a 2D
+    Gaussian.
     """
 
-    error = np.zeros((2, 2), dtype=bool)
     with pytest.raises(ValueError):
-        centroid_1dg(np.zeros((4, 4)), error=error)
+        func(data, **kwargs)
 
-    with pytest.raises(ValueError):
-        centroid_2dg(np.zeros((4, 4)), error=error)
 
+def test_gaussianconst2d_fit_deriv():
+    """
+    Test the analytic GaussianConst2D derivatives against finite
+    differences.
+    """
 
-def test_gaussian1d_moments():
-    x = np.arange(100)
-    desired = (75, 50, 5)
-    g = Gaussian1D(*desired)
-    data = g(x)
-    result = gaussian1d_moments(data)
-    assert_allclose(result, desired, rtol=0, atol=1.e-6)
+    params = np.array([1.3, 2.4, 24.7, 25.2, 3.2, 5.7, np.pi / 6.])
+    y, x = Y50_47, X50_47
+    deriv = GaussianConst2D.fit_deriv(x, y, *params)
+    assert len(deriv) == len(params)
 
-    data[0] = 1.e5
-    mask = np.zeros(data.shape).astype(bool)
-    mask[0] = True
-    result = gaussian1d_moments(data, mask=mask)
-    assert_allclose(result, desired, rtol=0, atol=1.e-6)
+    eps = 1.e-6
+    for i, param_deriv in enumerate(deriv):
+        dparams = np.zeros_like(params)
+        dparams[i] = eps
+        num_deriv = (GaussianConst2D.evaluate(x, y, *(params + dparams)) -
+                     GaussianConst2D.evaluate(x, y, *(params - dparams)))
+        num_deriv /= 2. * eps
+        assert_allclose(np.broadcast_to(param_deriv, num_deriv.shape),
+                        num_deriv, rtol=0, atol=1.e-7)
 
-    data[0] = np.nan
-    mask = np.zeros(data.shape).astype(bool)
-    mask[0] = True
-    result = gaussian1d_moments(data, mask=mask)
-    assert_allclose(result, desired, rtol=0, atol=1.e-6)
 
+def test_gaussian2d_closed_form():
+    xc_ref, yc_ref = 24.7, 25.2
+    model = Gaussian2D(2.4, xc_ref, yc_ref, x_stddev=3.2, y_stddev=5.7,
+                       theta=np.pi / 6.)
+    y, x = Y50_47, X50_47
+    data = model(x, y) + 1.
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[10, 10] = True
+    data[10, 10] = 1.e5
 
-@pytest.mark.skipif('not HAS_SCIPY')
-def test_fit2dgaussian_dof():
-    data = np.ones((2, 2))
-    with pytest.raises(ValueError):
-        fit_2dgaussian(data)
+    params = _gaussian2d_closed_form(data, mask)
+    assert_allclose(params[2:4], [xc_ref, yc_ref], rtol=0, atol=1.e-3)
+    assert_allclose(params[1], 2.4, rtol=1.e-3)
 
+    # the data must have a peak
+    assert _gaussian2d_closed_form(np.ones((5, 5)), mask[:5, :5]) is None
+
+
+@functools.lru_cache()
+def _epsf_data(oversampling, offsets):
+    """
+    Return a read-only oversampled `IntegratedGaussianPRF` ePSF image
+    (25 pixels on a side) and the position of its center.
+
+    The images are cached by ``(x, y)`` oversampling factors and
+    ``(x, y)`` offsets from the center, which must be tuples.
+    """
 
-@pytest.mark.skipif('not HAS_SCIPY')
-def test_centroid_epsf():
     sigma = 0.5
     psf = IntegratedGaussianPRF(sigma=sigma)
-    for oversampling in [4, (4, 6)]:
-        if not hasattr(oversampling, '__len__'):
-            _oversampling = (oversampling, oversampling)
-        else:
-            _oversampling = oversampling
-        x = np.arange(1 + 25 * _oversampling[0]) / _oversampling[0]
-        x0 = x[-1] / 2
-        x -= x0
-        y = np.arange(1 + 25 * _oversampling[1]) / _oversampling[1]
-        y0 = y[-1] / 2
-        y -= y0
-        offsets = np.array([0.1, 0.03])
-        data = psf.evaluate(x=x.reshape(1, -1), y=y.reshape(-1, 1), flux=1, x_0=offsets[0],
-                            y_0=offsets[1], sigma=sigma)
+    x = np.arange(1 + 25 * oversampling[0]) / oversampling[0]
+    y = np.arange(1 + 25 * oversampling[1]) / oversampling[1]
+    center = x[-1] / 2
+    data = psf.evaluate(x=(x - center)[np.newaxis, :],
+                        y=(y - center)[:, np.newaxis], flux=1,
+                        x_0=offsets[0], y_0=offsets[1], sigma=sigma)
+    data.flags.writeable = False
+
+    return data, center
+
 
+@pytest.mark.skipif('not HAS_SCIPY')
+@pytest.mark.parametrize(('oversampling', 'xy_oversampling'), OVERSAMPLINGS)
+def test_centroid_epsf(oversampling, xy_oversampling):
+    offsets = np.array([0.1, 0.03])
+    data, x0 = _epsf_data(xy_oversampling, tuple(offsets))
+
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[0, 0] = 1
+    centers = centroid_epsf(data, mask=mask, oversampling=oversampling)
+    assert_allclose(centers, offsets+x0, rtol=1e-3, atol=1e-2)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+def test_centroid_epsf_unequal_oversampling():
+    """
+    Test that the y shift uses the y-axis oversampling factor, i.e.,
+    that transposing the ePSF and its oversampling transposes the
+    centroid.
+    """
+
+    oversampling = (8, 2)
+    offsets = np.array([0.1, 0.03])
+    data, x0 = _epsf_data(oversampling, tuple(offsets))
+
+    centers = centroid_epsf(data, oversampling=oversampling)
+    centers_t = centroid_epsf(data.T, oversampling=oversampling[::-1])
+    assert_allclose(centers, centers_t[::-1])
+    assert_allclose(centers, offsets + x0, atol=1e-2)
+
+
+@pytest.mark.parametrize('use_mask', [True, False])
+@pytest.mark.parametrize('footprint', [None, np.array([[0, 1, 0],
+                                                       [1, 1, 1],
+                                                       [0, 1, 0]])])
+def test_centroid_sources_com(use_mask, footprint):
+    """
+    Test that the batched centroid_com path in centroid_sources gives
+    the same results as centroiding each source cutout separately.
+    """
+
+    def centroid_com_single(data, mask=None):
+        return centroid_com(data, mask=mask)
+
+    model = Gaussian2D(2.4, 24.7, 25.2, x_stddev=5.0, y_stddev=5.0)
+    y, x = Y50, X50
+    data = model(x, y)
+    data[23, 30] = np.nan
+    mask = None
+    if use_mask:
         mask = np.zeros(data.shape, dtype=bool)
-        mask[0, 0] = 1
-        centers = centroid_epsf(data, mask=mask, oversampling=oversampling)
-        assert_allclose(centers, offsets+x0, rtol=1e-3, atol=1e-2)
+        mask[20, :] = True
+        mask[23, 30] = True
+    xpos = [24.7, 30.1, 0.2, 49.6, 12.0]
+    ypos = [25.2, 22.6, 1.4, 48.8, 45.5]
 
+    kwargs = {'box_size': 7, 'footprint': footprint, 'mask': mask}
+    xcen, ycen = centroid_sources(data, xpos, ypos, **kwargs)
+    xcen2, ycen2 = centroid_sources(data, xpos, ypos,
+                                    centroid_func=centroid_com_single,
+                                    **kwargs)
+    assert_allclose(xcen, xcen2, rtol=0, atol=1.e-10)
+    assert_allclose(ycen, ycen2, rtol=0, atol=1.e-10)
 
-def test_centroid_exceptions():
-    data = np.ones((5, 5), dtype=float)
-    mask = np.zeros((4, 5), dtype=int)
-    mask[2, 2] = 1
 
-    # Test data and mask having the same shape
-    with pytest.raises(ValueError):
-        centroid_epsf(data, mask)
+def test_centroid_sources_com_maskedarray():
+    """
+    Test that the mask of a MaskedArray image is used by the batched
+    centroid_com path in centroid_sources.
+    """
 
-    with pytest.raises(ValueError):
-        centroid_epsf(data, shift_val=-1)
+    data = np.ones((20, 20))
+    data[0, 0] = 1000.
+    data[19, 13] = 1000.
+    mask = data > 1.
+    xcen, ycen = centroid_sources(np.ma.MaskedArray(data, mask=mask),
+                                  [3., 16.], [3., 16.], box_size=7)
+    # one corner pixel is masked in each of the 7x7 cutouts
+    assert_allclose(xcen, [3.0625, 16.0625], rtol=0, atol=1.e-10)
+    assert_allclose(ycen, [3.0625, 15.9375], rtol=0, atol=1.e-10)
 
-    with pytest.raises(ValueError):
-        centroid_epsf(data, oversampling=-1)
-    with pytest.raises(ValueError):
-        centroid_com(data, oversampling=-1)
+    xcen2, ycen2 = centroid_sources(data, [3., 16.], [3., 16.],
+                                    box_size=7, mask=mask)
+    assert_allclose(xcen, xcen2, rtol=0, atol=1.e-10)
+    assert_allclose(ycen, ycen2, rtol=0, atol=1.e-10)
+
+
+def test_centroid_sources_mask_per_source():
+    """
+    Test that a centroid_func that modifies its mask in place does not
+    change the masks passed for the other sources.
+    """
 
-    data = np.ones((21, 21), dtype=float)
-    data[10, 10] = np.inf
+    nunmasked = []
+
+    def centroid_func(data, mask=None):
+        nunmasked.append(np.count_nonzero(~mask))
+        mask[...] = True
+        return 0., 0.
+
+    data = np.ones((20, 20))
+    footprint = np.ones((5, 5), dtype=bool)
+    footprint[0, 0] = False
+    centroid_sources(data, [5., 10., 15.], [5., 10., 15.],
+                     footprint=footprint, centroid_func=centroid_func)
+    assert nunmasked == [24, 24, 24]
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+def test_centroid_sources_nproc():
+    model = Gaussian2D(2.4, 24.7, 25.2, x_stddev=5.0, y_stddev=5.0)
+    y, x = Y50, X50
+    data = model(x, y)
+    error = np.sqrt(data)
+    xpos = [24.7, 26.1, 23.3]
+    ypos = [25.2, 24.6, 27.5]
+
+    centroids1 = centroid_sources(data, xpos, ypos, box_size=21,
+                                  error=error, centroid_func=centroid_1dg)
+    centroids2 = centroid_sources(data, xpos, ypos, box_size=21,
+                                  error=error, centroid_func=centroid_1dg,
+                                  nproc=2)
+    assert_allclose(centroids1, centroids2)
+
+    for nproc in (0, -1, 1.5, True):
+        with pytest.raises(ValueError):
+            centroid_sources(data, xpos, ypos, box_size=21,
+                             centroid_func=centroid_1dg, nproc=nproc)
+
+
+@pytest.mark.parametrize('small_shape', [(5, 5), (4, 6), (1, 1)])
+def test_overlap_slices(small_shape):
+    large_shape = (20, 30)
+    xpos = [0., 1., 2.5, -0.5, 29.5, 12.3, 29.2]
+    ypos = [0.5, 1.5, -1., 3., 19.5, 17.8, 10.]
+
+    slices = _overlap_slices(large_shape, small_shape, xpos, ypos)
+    for xp, yp, slc in zip(xpos, ypos, slices):
+        assert slc == overlap_slices(large_shape, small_shape, (yp, xp))
+
+    with pytest.raises(NoOverlapError):
+        _overlap_slices(large_shape, small_shape, [100.], [0.])
     with pytest.raises(ValueError):
-        centroid_epsf(data)
+        _overlap_slices(large_shape, small_shape, [np.nan], [0.])
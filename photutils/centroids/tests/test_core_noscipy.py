@@ -0,0 +1,90 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Tests for the core module that do not require scipy.
+"""
+
+from astropy.modeling.models import Gaussian1D
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+from ..core import centroid_com, centroid_epsf, gaussian1d_moments
+
+
+# a 1D Gaussian for the gaussian1d_moments tests
+G1D_PARAMS = (75, 50, 5)
+G1D_DATA = Gaussian1D(*G1D_PARAMS)(np.arange(100))
+G1D_DATA.flags.writeable = False
+
+# small hand-crafted centroid_com inputs
+COM_DATA = np.ones((2, 2))
+COM_MASK = ((False, False), (True, True))
+NONBOOL_DATA = np.arange(16).reshape(4, 4)
+NONBOOL_MASK = np.zeros(NONBOOL_DATA.shape)
+NONBOOL_MASK[0:2, :] = 1
+for _arr in (COM_DATA, NONBOOL_DATA, NONBOOL_MASK):
+    _arr.flags.writeable = False
+
+
+def test_centroids_withmask_nonbool():
+    mask2 = np.array(NONBOOL_MASK, dtype=bool)
+
+    xc1, yc1 = centroid_com(NONBOOL_DATA, mask=NONBOOL_MASK)
+    xc2, yc2 = centroid_com(NONBOOL_DATA, mask=mask2)
+    assert_allclose([xc1, yc1], [xc2, yc2])
+
+
+def test_centroid_com_mask():
+    """Test centroid_com with and without an image_mask."""
+
+    centroid = centroid_com(COM_DATA, mask=None)
+    centroid_mask = centroid_com(COM_DATA, mask=COM_MASK)
+    assert_allclose([0.5, 0.5], centroid, rtol=0, atol=1.e-6)
+    assert_allclose([0.5, 0.0], centroid_mask, rtol=0, atol=1.e-6)
+
+    # the mask of a MaskedArray input is used
+    data = np.ma.MaskedArray([[1., 1.], [100., 100.]], mask=COM_MASK)
+    assert_allclose([0.5, 0.0], centroid_com(data), rtol=0, atol=1.e-6)
+    assert_allclose([0.5, 0.0], centroid_com(data, mask=COM_MASK),
+                    rtol=0, atol=1.e-6)
+
+
+def test_gaussian1d_moments():
+    result = gaussian1d_moments(G1D_DATA)
+    assert_allclose(result, G1D_PARAMS, rtol=0, atol=1.e-6)
+
+    data = G1D_DATA.copy()
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[0] = True
+    data[0] = 1.e5
+    result = gaussian1d_moments(data, mask=mask)
+    assert_allclose(result, G1D_PARAMS, rtol=0, atol=1.e-6)
+
+    data[0] = np.nan
+    result = gaussian1d_moments(data, mask=mask)
+    assert_allclose(result, G1D_PARAMS, rtol=0, atol=1.e-6)
+
+
+def test_centroid_exceptions():
+    data = np.ones((5, 5), dtype=float)
+    mask = np.zeros((4, 5), dtype=int)
+    mask[2, 2] = 1
+
+    # Test data and mask having the same shape
+    with pytest.raises(ValueError):
+        centroid_epsf(data, mask)
+
+    with pytest.raises(ValueError):
+        centroid_epsf(data, shift_val=-1)
+
+    with pytest.raises(ValueError):
+        centroid_epsf(data, oversampling=-1)
+    with pytest.raises(ValueError):
+        centroid_com(data, oversampling=-1)
+    with pytest.raises(ValueError):
+        centroid_com(data, oversampling=(2, 0))
+
+    data = np.ones((21, 21), dtype=float)
+    data[10, 10] = np.inf
+    with pytest.raises(ValueError):
+        centroid_epsf(data)